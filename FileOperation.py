@@ -6,56 +6,158 @@ from datetime import datetime
 import json
 from collections import defaultdict
 import re
+import errno
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+def move_file(src, dst, src_dir_fd=None, dst_dir_fd=None):
+    """
+    Move a file with a single rename, copying only when crossing filesystems.
+    
+    When descriptors for the source and destination directories are given, the
+    rename resolves just the file names against them (renameat) instead of
+    walking both full paths again.
+    """
+    try:
+        if src_dir_fd is not None and dst_dir_fd is not None:
+            os.rename(os.path.basename(src), os.path.basename(dst),
+                      src_dir_fd=src_dir_fd, dst_dir_fd=dst_dir_fd)
+        else:
+            os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        if not _copy_in_kernel(src, dst):
+            shutil.move(src, dst)
+            return
+        shutil.copystat(src, dst)
+        os.unlink(src)
+
+
+# copy_file_range errors meaning "not possible here" rather than a real failure
+_COPY_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL}
+
+
+def _copy_in_kernel(src, dst):
+    """
+    Copy a regular file's data with os.copy_file_range, which lets the kernel
+    reflink or copy server-side instead of passing the bytes through user space.
+    
+    Returns False, leaving nothing behind, when the platform or filesystem pair
+    doesn't support it, or when fewer bytes came across than the source holds,
+    so the caller can fall back to an ordinary copy.
+    """
+    if not hasattr(os, 'copy_file_range'):
+        return False
+    
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        size = os.fstat(src_fd).st_size
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        copied = 0
+        try:
+            while True:
+                count = os.copy_file_range(src_fd, dst_fd, 1 << 30)
+                if count == 0:
+                    break
+                copied += count
+        except OSError as e:
+            os.close(dst_fd)
+            os.unlink(dst)
+            if copied == 0 and e.errno in _COPY_UNSUPPORTED:
+                return False
+            raise
+        os.close(dst_fd)
+        # Some filesystems (procfs-like, some FUSE and network mounts) report 0
+        # before the end; the source is only removed once the sizes agree
+        if copied != size:
+            os.unlink(dst)
+            return False
+    finally:
+        os.close(src_fd)
+    return True
+
+
+def is_empty_dir(path):
+    """Return True if the directory has no entries, reading at most one of them"""
+    with os.scandir(path) as it:
+        return next(it, None) is None
 
 
 class FileOperation:
-    def __init__(self, src_path, dest_path, created_dir=None):
-        self.src_path = Path(src_path)
-        self.dest_path = Path(dest_path)
-        self.created_dir = Path(created_dir) if created_dir else None
-        self.timestamp = datetime.now()
+    # Histories can hold many operations; slots drop the per-instance __dict__
+    __slots__ = ('src', 'dest', 'created', 'timestamp')
+
+    def __init__(self, src_path, dest_path, created_dir=None, timestamp=None):
+        # Plain strings; Path objects are only built when a caller asks for them
+        self.src = os.fspath(src_path)
+        self.dest = os.fspath(dest_path)
+        self.created = os.fspath(created_dir) if created_dir else None
+        # Epoch seconds; a batch of moves can share one timestamp
+        self.timestamp = time.time() if timestamp is None else timestamp
+    
+    @property
+    def src_path(self):
+        return Path(self.src)
     
+    @property
+    def dest_path(self):
+        return Path(self.dest)
+    
+    @property
+    def created_dir(self):
+        return Path(self.created) if self.created else None
         
     def undo(self):
         """Reverse the file operation and cleanup empty directories"""
         try:
-            if self.dest_path.exists():
-                # Create parent directory of source if it doesn't exist
-                self.src_path.parent.mkdir(parents=True, exist_ok=True)
-                # Move file back
-                shutil.move(str(self.dest_path), str(self.src_path))
+            if os.path.lexists(self.dest):
+                # Move file back, creating the source's parent directory only if it's gone
+                try:
+                    move_file(self.dest, self.src)
+                except FileNotFoundError:
+                    os.makedirs(os.path.dirname(self.src), exist_ok=True)
+                    move_file(self.dest, self.src)
                 
                 # Try to remove the destination directory if it's empty
-                dest_dir = self.dest_path.parent
+                dest_dir = os.path.dirname(self.dest)
                 try:
-                    if dest_dir.exists() and not any(dest_dir.iterdir()):
-                        dest_dir.rmdir()
-                        logging.info(f"Removed empty directory: {dest_dir}")
+                    if is_empty_dir(dest_dir):
+                        os.rmdir(dest_dir)
+                        logger.info(f"Removed empty directory: {dest_dir}")
+                except FileNotFoundError:
+                    pass
                 except Exception as e:
-                    logging.error(f"Error removing directory {dest_dir}: {e}")
+                    logger.error(f"Error removing directory {dest_dir}: {e}")
                 
                 return True
             return False
         except Exception as e:
-            logging.error(f"Error during undo: {e}")
+            logger.error(f"Error during undo: {e}")
             return False
     
     def to_dict(self):
         """Convert operation to dictionary for serialization"""
         return {
-            'src_path': str(self.src_path),
-            'dest_path': str(self.dest_path),
-            'created_dir': str(self.created_dir) if self.created_dir else None,
-            'timestamp': self.timestamp.isoformat()
+            'src_path': self.src,
+            'dest_path': self.dest,
+            'created_dir': self.created,
+            'timestamp': self.timestamp
         }
     
     @classmethod
     def from_dict(cls, data):
         """Create operation instance from dictionary"""
-        operation = cls(
+        timestamp = data['timestamp']
+        if isinstance(timestamp, str):
+            # Histories written before timestamps were stored as floats
+            timestamp = datetime.fromisoformat(timestamp).timestamp()
+        return cls(
             data['src_path'], 
             data['dest_path'],
-            data['created_dir']
-        )
-        operation.timestamp = datetime.fromisoformat(data['timestamp'])
-        return operation
\ No newline at end of file
+            data['created_dir'],
+            timestamp
+        )
\ No newline at end of file
@@ -1,17 +1,52 @@
 import os
-import shutil
+import sys
 from pathlib import Path
 import logging
-from datetime import datetime
 import json
-from collections import defaultdict
+from collections import defaultdict, deque
 import re
-from FileOperation import FileOperation
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache, partial
+from itertools import islice
+from FileOperation import FileOperation, is_empty_dir, move_file
+
+logger = logging.getLogger(__name__)
+
+# Destination names are checked in memory; where filesystems are usually
+# case-insensitive, 'A.jpg' and 'a.jpg' must count as the same name
+CASE_INSENSITIVE_FS = sys.platform in ('win32', 'darwin')
+
+# Below this many files the moves are done serially; a thread pool isn't worth starting
+PARALLEL_MOVE_THRESHOLD = 8
+
+
+def split_extension(name):
+    """Split a file name into (stem, suffix) following Path.stem/Path.suffix rules"""
+    dot = name.rfind('.')
+    if 0 < dot < len(name) - 1:
+        return name[:dot], name[dot:]
+    return name, ''
 
 
 class FileOrganizer:
-    def __init__(self, source_dir):
+    # Logging is set up by the first organizer created in the process
+    _logging_configured = False
+    _log_file = None
+
+    def __init__(self, source_dir, history_dir=None):
+        """
+        Args:
+            source_dir (str): The directory to organize
+            history_dir (str, optional): Where to keep the operation history.
+                Defaults to source_dir; a directory outside it keeps the history
+                file out of the directory scans altogether.
+        """
         self.source_dir = Path(source_dir)
+        # String form for the hot paths, which work on plain strings
+        self._source_dir_str = str(self.source_dir)
         self.setup_logging()
         
         # Define category mappings
@@ -23,77 +58,150 @@ class FileOrganizer:
             'archives': ['.zip', '.rar', '.7z', '.tar', '.gz'],
             'code': ['.py', '.js', '.html', '.css', '.java', '.cpp', '.php']
         }
+        self._build_extension_index()
+        
+        # Memoized extension -> category resolution; cleared whenever rules or mappings change
+        self._get_category = lru_cache(maxsize=256)(self._resolve_category)
         
         # Custom rules storage
         self.custom_rules = []
+        self._rule_matcher = None
+        self._rule_dests = []
+        
+        # Directory path string for every category this organizer can move files
+        # into, and the categories whose directory is known to exist
+        self._category_dirs = {}
+        self._existing_categories = set()
+        self._refresh_category_dirs()
         
         # Operation history
-        self.operations = []
-        self.history_file = self.source_dir / '.file_organizer_history.json'
+        self.operations = deque()
+        if history_dir is None:
+            self.history_file = self.source_dir / '.file_organizer_history.jsonl'
+        else:
+            # One file per organized directory, named after it
+            history_dir = Path(history_dir).expanduser()
+            history_dir.mkdir(parents=True, exist_ok=True)
+            digest = hashlib.sha1(str(self.source_dir.resolve()).encode('utf-8')).hexdigest()[:12]
+            self.history_file = history_dir / f'{self.source_dir.name}_{digest}.jsonl'
+        self._legacy_history_file = self.source_dir / '.file_organizer_history.json'
+        
+        # Files of the organizer's own that directory scans must leave in place
+        skip_names = [self.history_file.name, self._legacy_history_file.name]
+        log_file = FileOrganizer._log_file
+        if log_file is not None and str(log_file.parent) == self._source_dir_str:
+            skip_names.append(log_file.name)
+        self._skip_names = frozenset(skip_names)
+        # Byte offset in history_file where each persisted operation's line starts
+        self._history_offsets = []
+        self._defer_history = False
         self.load_history()
         
     def setup_logging(self):
         """Configure logging to track file operations"""
-        log_filename = f'file_organizer_{datetime.now():%Y%m%d_%H%M%S}.log'
-        log_file = Path(self.source_dir) / log_filename
+        self._configure_logging(self.source_dir)
+        logger.info(f"Started file organization in: {self.source_dir}")
+
+    @classmethod
+    def _configure_logging(cls, source_dir):
+        """Install the log file and console handlers, once per process"""
+        if cls._logging_configured:
+            return
+        cls._logging_configured = True
+        log_file = Path(source_dir) / time.strftime('file_organizer_%Y%m%d_%H%M%S.log')
         
         logging.basicConfig(
             level=logging.INFO,
             format='%(asctime)s - %(message)s',
             handlers=[
-                logging.FileHandler(log_file),
+                # delay: the file is only opened once something is logged
+                logging.FileHandler(log_file, delay=True, encoding='utf-8'),
                 logging.StreamHandler()  # This will also print to console
             ]
         )
-        
-        logging.info(f"Started file organization in: {self.source_dir}")
-        logging.info(f"Log file created at: {log_file}")
+        cls._log_file = log_file
+        logger.info(f"Log file created at: {log_file}")
 
     def analyze_directory(self):
         """Analyze directory and return required categories"""
         required_categories = set()
-        for item in self.source_dir.iterdir():
-            if item.is_file() and item.name != '.file_organizer_history.json':
-                category = self.get_category(item.suffix)
-                required_categories.add(category)
+        skip_names = self._skip_names
+        with os.scandir(self._source_dir_str) as it:
+            for entry in it:
+                if entry.name not in skip_names and entry.is_file(follow_symlinks=False):
+                    category = self.get_category(split_extension(entry.name)[1])
+                    required_categories.add(category)
         return required_categories
 
     def create_category_dir(self, category):
         """Create a single category directory and return True if created"""
-        category_path = self.source_dir / category
-        if not category_path.exists():
-            category_path.mkdir(exist_ok=True)
-            logging.info(f"Created category directory: {category}")
-            return True
-        return False
+        if category in self._existing_categories:
+            return False
+        
+        category_path = self._category_dirs.get(category)
+        if category_path is None:
+            category_path = self._category_dirs[category] = os.path.join(self._source_dir_str, category)
+        try:
+            # One mkdir when the parent exists; nested custom destinations get their parents too
+            os.makedirs(category_path)
+            created = True
+        except FileExistsError:
+            created = False
+        self._existing_categories.add(category)
+        return created
+
+    def _recreate_category_dir(self, category):
+        """Forget a cached category directory that has gone missing and create it again"""
+        self._existing_categories.discard(category)
+        created = self.create_category_dir(category)
+        if created:
+            logger.info(f"Recreated missing category directory: {category}")
+        return created
+
+    def _refresh_category_dirs(self):
+        """Precompute the directory path of every known category, once per change"""
+        categories = list(self.category_mappings)
+        categories.append('misc')
+        categories.extend(destination for _, destination in self.custom_rules)
+        source_dir = self._source_dir_str
+        for category in categories:
+            if category not in self._category_dirs:
+                self._category_dirs[category] = os.path.join(source_dir, category)
 
     def cleanup_empty_directories(self):
-        """Remove empty category directories"""
+        """Remove empty category directories, including custom rule destinations"""
         removed = []
-        for category in self.category_mappings.keys():
-            category_path = self.source_dir / category
+        # Only directories this organizer owns are considered; other empty folders
+        # in source_dir belong to the user and are left alone
+        for category, category_path in self._category_dirs.items():
             try:
-                if category_path.exists() and not any(category_path.iterdir()):
-                    category_path.rmdir()
+                if is_empty_dir(category_path):
+                    os.rmdir(category_path)
                     removed.append(category)
-                    logging.info(f"Removed empty directory: {category}")
+                    self._existing_categories.discard(category)
+                    logger.info(f"Removed empty directory: {category}")
+            except (FileNotFoundError, NotADirectoryError):
+                continue
             except Exception as e:
-                logging.error(f"Error removing directory {category}: {e}")
-        
-        # Also check misc directory
-        misc_path = self.source_dir / 'misc'
-        if misc_path.exists() and not any(misc_path.iterdir()):
-            try:
-                misc_path.rmdir()
-                removed.append('misc')
-                logging.info("Removed empty misc directory")
-            except Exception as e:
-                logging.error(f"Error removing misc directory: {e}")
+                logger.error(f"Error removing directory {category}: {e}")
         
         return removed
 
-    def organize_files(self, method='extension'):
-        """Organize files using specified method"""
+    def organize_files(self, method='extension', workers=None):
+        """
+        Organize files using specified method.
+        
+        Moves are planned in one pass over the directory and then carried out,
+        on a thread pool when there are enough of them to be worth it.
+        
+        Args:
+            method (str): Organization method, currently only 'extension'
+            workers (int, optional): Number of threads used for the moves.
+                Defaults to min(32, cpu_count * 4); 1 moves files serially.
+        
+        Returns:
+            int: Number of files moved
+        """
         # Analyze directory first
         required_categories = self.analyze_directory()
         
@@ -102,54 +210,195 @@ class FileOrganizer:
         for category in required_categories:
             if self.create_category_dir(category):
                 created_dirs.add(category)
+        if created_dirs:
+            logger.info(f"Created category directories: {', '.join(sorted(created_dirs))}")
+        
+        moves = self._plan_moves(created_dirs)
         
+        if workers is None:
+            workers = min(32, (os.cpu_count() or 1) * 4)
+        dir_fds = self._open_dir_fds(moves)
+        # Every operation in the batch shares the run's timestamp
+        execute = partial(self._execute_move, dir_fds=dir_fds, timestamp=time.time())
+        try:
+            if workers > 1 and len(moves) >= PARALLEL_MOVE_THRESHOLD:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(execute, moves))
+            else:
+                results = [execute(move) for move in moves]
+        finally:
+            for fd in dir_fds.values():
+                os.close(fd)
+        
+        # Record operations in plan order so undo still unwinds them as a stack
         moved_files = 0
+        moved_by_category = defaultdict(list)
+        for (src_path, _, category, _), operation in zip(moves, results):
+            if operation:
+                self.operations.append(operation)
+                moved_files += 1
+                moved_by_category[category].append(src_path)
+        
+        # One log record per category rather than one per file
+        for category, sources in moved_by_category.items():
+            logger.info("Moved %d files to %s: %s", len(sources), category,
+                        ', '.join(os.path.basename(src_path) for src_path in sources))
+            
+        self.save_history()
+        logger.info(f"Organization complete. Moved {moved_files} files.")
+        return moved_files
+
+    def _plan_moves(self, created_dirs):
+        """
+        Scan source_dir once and decide where every file goes.
+        
+        Returns a list of (src_path, dest_path, category, created_dir) tuples. The
+        loop runs once per file, so the lookups it needs are bound to locals up front.
+        """
+        moves = []
+        taken_names = {}
+        # Destinations that couldn't be listed; their names are checked on disk one by one
+        unlisted_dirs = set()
+        name_counters = defaultdict(int)
+        skip_names = self._skip_names
+        get_category = self.get_category
+        category_dirs = self._category_dirs
+        sep = os.sep
+        lexists = os.path.lexists
+        fold = str.casefold if CASE_INSENSITIVE_FS else str
         try:
-            for item in self.source_dir.iterdir():
-                if item.is_file() and item.name != '.file_organizer_history.json':
-                    category = self.get_category(item.suffix)
-                    dest_dir = self.source_dir / category
-                    dest_path = dest_dir / item.name
+            with os.scandir(self._source_dir_str) as it:
+                for entry in it:
+                    name = entry.name
+                    if name in skip_names or not entry.is_file(follow_symlinks=False):
+                        continue
+                    # Work on plain strings; only FileOperation wraps them in Path
+                    base_name, ext = split_extension(name)
+                    category = get_category(ext)
+                    dest_dir = category_dirs[category]
+                    
+                    # Names already in the destination are listed once per directory;
+                    # names planned earlier in this run are added as they are taken
+                    taken = taken_names.get(dest_dir)
+                    if taken is None:
+                        try:
+                            taken = self._list_names(dest_dir, fold)
+                        except FileNotFoundError:
+                            # Removed outside the organizer since it was cached; make it again
+                            if self._recreate_category_dir(category):
+                                created_dirs.add(category)
+                            taken = set()
+                        if taken is None:
+                            # An unreadable listing is not an empty one: rename would
+                            # replace any file it missed
+                            unlisted_dirs.add(dest_dir)
+                            taken = set()
+                        taken_names[dest_dir] = taken
+                    probe = dest_dir in unlisted_dirs
                     
-                    # Handle duplicates
-                    if dest_path.exists():
-                        base_name = dest_path.stem
-                        extension = dest_path.suffix
-                        counter = 1
+                    # Handle duplicates, resuming from the last suffix used for this name
+                    dest_name = name
+                    if fold(dest_name) in taken or (probe and lexists(dest_dir + sep + dest_name)):
+                        key = (dest_dir, base_name, ext)
+                        counter = name_counters[key]
                         
-                        while dest_path.exists():
-                            new_name = f"{base_name}_{counter}{extension}"
-                            dest_path = dest_dir / new_name
+                        while fold(dest_name) in taken or (probe and lexists(dest_dir + sep + dest_name)):
                             counter += 1
+                            dest_name = f"{base_name}_{counter}{ext}"
+                        name_counters[key] = counter
                     
-                    # Move file and record operation
-                    shutil.move(str(item), str(dest_path))
+                    taken.add(fold(dest_name))
                     created_dir = category if category in created_dirs else None
-                    self.operations.append(FileOperation(item, dest_path, created_dir))
-                    moved_files += 1
-                    logging.info(f"Moved '{item.name}' to {category} directory")
+                    moves.append((entry.path, dest_dir + sep + dest_name, category, created_dir))
                     
         except Exception as e:
-            logging.error(f"An error occurred: {str(e)}")
-            
-        self.save_history()
-        logging.info(f"Organization complete. Moved {moved_files} files.")
-        return moved_files
+            logger.error(f"An error occurred: {str(e)}")
+        return moves
+
+    @staticmethod
+    def _list_names(directory, fold):
+        """
+        Return the set of (folded) entry names in a directory, or None if it can't be read.
+        Raises FileNotFoundError if the directory is missing.
+        """
+        try:
+            return {fold(name) for name in os.listdir(directory)}
+        except FileNotFoundError:
+            raise
+        except OSError as e:
+            logger.error(f"Error listing {directory}, checking names one by one: {e}")
+            return None
+
+    def _open_dir_fds(self, moves):
+        """
+        Open the source and destination directories of the planned moves once,
+        so each move can be a renameat on bare file names.
+        
+        Returns an empty dict where the platform can't rename relative to
+        directory descriptors; the moves then use full paths.
+        """
+        dir_fds = {}
+        if not moves or os.rename not in os.supports_dir_fd:
+            return dir_fds
+        
+        directories = {os.path.dirname(moves[0][0])}
+        directories.update(os.path.dirname(dest_path) for _, dest_path, _, _ in moves)
+        try:
+            for directory in directories:
+                dir_fds[directory] = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError as e:
+            logger.debug(f"Falling back to full-path moves: {e}")
+            for fd in dir_fds.values():
+                os.close(fd)
+            dir_fds = {}
+            # A destination removed since planning is made again before moving into it
+            for category in {category for _, _, category, _ in moves}:
+                if not os.path.isdir(self._category_dirs[category]):
+                    self._recreate_category_dir(category)
+        return dir_fds
+
+    def _execute_move(self, move, dir_fds=None, timestamp=None):
+        """
+        Carry out one planned move and return its FileOperation, or None on failure.
+        
+        Runs on worker threads, so it never raises: an exception escaping
+        executor.map would drop the operations of moves that already happened.
+        """
+        src_path, dest_path, category, created_dir = move
+        try:
+            if dir_fds:
+                move_file(src_path, dest_path,
+                          src_dir_fd=dir_fds[os.path.dirname(src_path)],
+                          dst_dir_fd=dir_fds[os.path.dirname(dest_path)])
+            else:
+                move_file(src_path, dest_path)
+        except Exception as e:
+            logger.error(f"Error moving '{src_path}' to {category}: {e}")
+            return None
+        return FileOperation(src_path, dest_path, created_dir, timestamp)
 
     def undo_last(self):
         """Undo the last file operation"""
         if not self.operations:
-            logging.info("No operations to undo")
+            logger.info("No operations to undo")
             return False
         
         last_operation = self.operations.pop()
         if last_operation.undo():
-            logging.info(f"Undid move of {last_operation.dest_path.name} back to {last_operation.src_path}")
+            # undo() may have removed the category directory
+            dest_dir = os.path.dirname(last_operation.dest)
+            for category, category_path in self._category_dirs.items():
+                if category_path == dest_dir:
+                    self._existing_categories.discard(category)
+            logger.info(f"Undid move of {os.path.basename(last_operation.dest)} back to {last_operation.src}")
+            # undo() already removed the destination if it emptied it, and nothing
+            # else changed, so the full cleanup pass is left to undo_all and the menu
             self.save_history()
-            self.cleanup_empty_directories()
             return True
         else:
-            logging.error(f"Failed to undo move of {last_operation.dest_path.name}")
+            logger.error(f"Failed to undo move of {os.path.basename(last_operation.dest)}")
+            # The operation is dropped either way; keep the log in step with memory
+            self.save_history()
             return False
 
     def undo_all(self):
@@ -157,14 +406,16 @@ class FileOrganizer:
         success_count = 0
         total_operations = len(self.operations)
         
-        while self.operations:
-            if self.undo_last():
-                success_count += 1
+        # Persist once at the end rather than after every single undo
+        with self._deferred_history():
+            while self.operations:
+                if self.undo_last():
+                    success_count += 1
         
         # Final cleanup of any remaining empty directories
         self.cleanup_empty_directories()
         
-        logging.info(f"Undid {success_count} out of {total_operations} operations")
+        logger.info(f"Undid {success_count} out of {total_operations} operations")
         return success_count
 
     
@@ -178,22 +429,96 @@ class FileOrganizer:
         Returns:
             str: The category name the file belongs to
         """
+        return self._get_category(file_extension)
+
+    def _resolve_category(self, file_extension):
+        """Uncached category lookup behind get_category"""
+        ext = file_extension.lower()
+        
         # First check custom rules
-        for pattern, destination in self.custom_rules:
-            if pattern.match(file_extension.lower()):
-                logging.debug(f"Matched custom rule: {file_extension} → {destination}")
+        if self.custom_rules:
+            destination = self._match_custom_rule(ext)
+            if destination:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Matched custom rule: %s → %s", file_extension, destination)
                 return destination
         
         # Then check standard categories
-        for category, extensions in self.category_mappings.items():
-            if file_extension.lower() in extensions:
-                logging.debug(f"Matched category {category} for extension {file_extension}")
-                return category
+        category = self._ext_to_category.get(ext)
+        if category:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Matched category %s for extension %s", category, file_extension)
+            return category
         
         # If no match found, return misc
-        logging.debug(f"No category match for {file_extension}, using 'misc'")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("No category match for %s, using 'misc'", file_extension)
         return 'misc'
 
+    def _match_custom_rule(self, file_extension):
+        """Return the destination of the first custom rule matching the extension, or None"""
+        if self._rule_matcher is not None:
+            match = self._rule_matcher.match(file_extension)
+            if match:
+                # The rule's wrapper group closes last, so it is always lastgroup
+                return self._rule_dests[int(match.lastgroup[len('_rule'):])]
+            return None
+        
+        for pattern, destination in self.custom_rules:
+            if pattern.match(file_extension):
+                return destination
+        return None
+
+    def _compile_custom_rules(self):
+        """Fuse all custom rules into one alternation regex matched in a single pass"""
+        self._rule_matcher = None
+        self._rule_dests = [destination for _, destination in self.custom_rules]
+        
+        patterns = [pattern for pattern, _ in self.custom_rules]
+        # Numbered backreferences and per-pattern flags would change meaning once fused,
+        # so such rule sets keep using the rule-by-rule loop
+        if any(p.flags != re.UNICODE or re.search(r'\\[1-9]', p.pattern) for p in patterns):
+            return
+        try:
+            self._rule_matcher = re.compile(
+                '|'.join(f'(?P<_rule{i}>{p.pattern})' for i, p in enumerate(patterns))
+            )
+        except re.error as e:
+            logger.debug(f"Custom rules could not be combined, matching one by one: {e}")
+
+    def _build_extension_index(self):
+        """Rebuild the extension -> category lookup from category_mappings"""
+        self._ext_to_category = {}
+        for category, extensions in self.category_mappings.items():
+            for ext in extensions:
+                # The first category listing an extension wins, as with the old linear scan
+                self._ext_to_category.setdefault(ext.lower(), category)
+
+    def add_custom_rule(self, pattern, destination):
+        """
+        Add a regex rule that sends matching extensions to a destination category.
+        Custom rules are checked before the standard categories, in the order added.
+        
+        Args:
+            pattern (str): Regex matched against the lower-cased extension, dot included
+            destination (str): The category directory to move matching files into
+        
+        Returns:
+            bool: True if the rule was added, False if the pattern is invalid
+        """
+        try:
+            compiled = re.compile(pattern)
+        except re.error as e:
+            logger.error(f"Invalid custom rule pattern {pattern!r}: {e}")
+            return False
+        
+        self.custom_rules.append((compiled, destination))
+        self._compile_custom_rules()
+        self._get_category.cache_clear()
+        self._refresh_category_dirs()
+        logger.info(f"Added custom rule: {pattern} → {destination}")
+        return True
+
     def add_extension_category(self, category, extensions):
         """
         Add new extensions to an existing or new category.
@@ -204,7 +529,8 @@ class FileOrganizer:
         """
         if category not in self.category_mappings:
             self.category_mappings[category] = []
-            logging.info(f"Created new category: {category}")
+            self._refresh_category_dirs()
+            logger.info(f"Created new category: {category}")
         
         # Add new extensions, avoiding duplicates
         added = []
@@ -215,9 +541,14 @@ class FileOrganizer:
                 added.append(ext)
         
         if added:
-            logging.info(f"Added extensions to {category}: {', '.join(added)}")
+            # New extensions go straight into the index; one that another category
+            # already lists needs a rebuild to settle which of them comes first
+            if any(self._ext_to_category.setdefault(ext, category) != category for ext in added):
+                self._build_extension_index()
+            self._get_category.cache_clear()
+            logger.info(f"Added extensions to {category}: {', '.join(added)}")
         else:
-            logging.info(f"No new extensions added to {category}")
+            logger.info(f"No new extensions added to {category}")
 
     def get_category_stats(self):
         """
@@ -260,88 +591,182 @@ class FileOrganizer:
         if category:
             if category in self.category_mappings and extension in self.category_mappings[category]:
                 self.category_mappings[category].remove(extension)
-                logging.info(f"Removed {extension} from {category}")
+                logger.info(f"Removed {extension} from {category}")
                 removed = True
         else:
             for cat, extensions in self.category_mappings.items():
                 if extension in extensions:
                     extensions.remove(extension)
-                    logging.info(f"Removed {extension} from {cat}")
+                    logger.info(f"Removed {extension} from {cat}")
                     removed = True
         
+        if removed:
+            self._build_extension_index()
+            self._get_category.cache_clear()
         return removed
     def save_history(self):
-        """Save operation history to JSON file"""
-        history_data = [op.to_dict() for op in self.operations]
+        """
+        Bring the history file in line with the in-memory operations.
+        
+        The file holds one JSON object per line and is only ever appended to or
+        truncated: new operations are appended, undone ones are cut off the end.
+        """
+        if self._defer_history:
+            return
+        
+        persisted = len(self._history_offsets)
+        count = len(self.operations)
         try:
-            with open(self.history_file, 'w') as f:
-                json.dump(history_data, f, indent=4)
-            logging.info(f"Saved {len(history_data)} operations to history file")
+            if count < persisted:
+                os.truncate(self.history_file, self._history_offsets[count])
+                del self._history_offsets[count:]
+            elif count > persisted:
+                # One encoder for the batch, without the default padding after , and :
+                encode = json.JSONEncoder(separators=(',', ':')).encode
+                # Unbuffered, so a failed write can't be flushed again when the file closes
+                with open(self.history_file, 'ab', buffering=0) as f:
+                    start = offset = f.tell()
+                    lines = []
+                    new_offsets = []
+                    # Only the operations added since the last save are serialized; take
+                    # them from the right end so the persisted prefix isn't walked
+                    new_operations = list(islice(reversed(self.operations), count - persisted))
+                    for op in reversed(new_operations):
+                        line = (encode(op.to_dict()) + '\n').encode('utf-8')
+                        new_offsets.append(offset)
+                        offset += len(line)
+                        lines.append(line)
+                    data = memoryview(b''.join(lines))
+                    try:
+                        while data:
+                            data = data[f.write(data):]
+                    except OSError:
+                        # Cut off whatever part of the batch made it to disk so the
+                        # file still ends on the last operation counted as saved
+                        f.truncate(start)
+                        raise
+                # Only count the batch as saved once it is on disk
+                self._history_offsets.extend(new_offsets)
+            logger.info(f"Saved {count} operations to history file")
         except Exception as e:
-            logging.error(f"Error saving history: {e}")
+            logger.error(f"Error saving history: {e}")
+
+    @contextmanager
+    def _deferred_history(self):
+        """Hold back save_history calls inside the block and save once on exit"""
+        self._defer_history = True
+        try:
+            yield
+        finally:
+            self._defer_history = False
+            self.save_history()
 
     def load_history(self):
-        """Load operation history from JSON file"""
+        """Load operation history from the JSON lines file"""
+        self.operations = deque()
+        self._history_offsets = []
+        
+        if not self.history_file.exists() and self._legacy_history_file.exists():
+            self._migrate_legacy_history()
+            return
+        
         if self.history_file.exists():
             try:
-                with open(self.history_file) as f:
-                    history_data = json.load(f)
-                
-                self.operations = []
-                for data in history_data:
-                    try:
-                        operation = FileOperation.from_dict(data)
-                        self.operations.append(operation)
-                    except Exception as e:
-                        logging.error(f"Error loading operation: {e}")
+                offset = 0
+                with open(self.history_file, 'rb') as f:
+                    for line in f:
+                        if not line.endswith(b'\n'):
+                            # Partial line from an interrupted write; drop it so appends stay aligned
+                            os.truncate(self.history_file, offset)
+                            break
+                        try:
+                            operation = FileOperation.from_dict(json.loads(line))
+                            self.operations.append(operation)
+                            self._history_offsets.append(offset)
+                        except Exception as e:
+                            logger.error(f"Error loading operation: {e}")
+                        offset += len(line)
                 
-                logging.info(f"Loaded {len(self.operations)} historical operations")
+                logger.info(f"Loaded {len(self.operations)} historical operations")
             except Exception as e:
-                logging.error(f"Error loading history file: {e}")
-                self.operations = []
+                logger.error(f"Error loading history file: {e}")
+                self.operations = deque()
+                self._history_offsets = []
         else:
-            logging.info("No history file found, starting fresh")
-            self.operations = []
+            logger.info("No history file found, starting fresh")
+
+    def _migrate_legacy_history(self):
+        """Convert a history file from the old single-JSON-array format"""
+        try:
+            with open(self._legacy_history_file) as f:
+                history_data = json.load(f)
+            
+            for data in history_data:
+                try:
+                    self.operations.append(FileOperation.from_dict(data))
+                except Exception as e:
+                    logger.error(f"Error loading operation: {e}")
+            
+            self.save_history()
+            if len(self._history_offsets) != len(self.operations):
+                # save_history logged the failure; keep the old file so the next load retries
+                self.history_file.unlink(missing_ok=True)
+                logger.error(f"Kept {self._legacy_history_file.name}; its operations could not be migrated")
+                return
+            self._legacy_history_file.unlink()
+            logger.info(f"Migrated {len(self.operations)} operations from {self._legacy_history_file.name}")
+        except Exception as e:
+            logger.error(f"Error migrating legacy history file: {e}")
 
     def get_operation_history(self):
         """Return formatted operation history"""
-        history = []
-        for op in self.operations:
-            history.append({
-                'timestamp': op.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                'file': op.src_path.name,
-                'from': str(op.src_path.parent),
-                'to': str(op.dest_path.parent),
-                'created_dir': str(op.created_dir) if op.created_dir else None
-            })
-        return history
+        # Work on the stored strings; formatting through time avoids a datetime per entry
+        fmt = '%Y-%m-%d %H:%M:%S'
+        strftime = time.strftime
+        localtime = time.localtime
+        basename = os.path.basename
+        dirname = os.path.dirname
+        return [
+            {
+                'timestamp': strftime(fmt, localtime(op.timestamp)),
+                'file': basename(op.src),
+                'from': dirname(op.src),
+                'to': dirname(op.dest),
+                'created_dir': op.created
+            }
+            for op in self.operations
+        ]
 
     def clear_history(self):
         """Clear operation history and remove history file"""
-        self.operations = []
+        self.operations = deque()
+        self._history_offsets = []
         try:
             if self.history_file.exists():
                 self.history_file.unlink()
-                logging.info("History file removed")
+                logger.info("History file removed")
         except Exception as e:
-            logging.error(f"Error removing history file: {e}")
+            logger.error(f"Error removing history file: {e}")
 
     def get_history_stats(self):
         """Get statistics about the operation history"""
         if not self.operations:
             return "No operations in history"
         
-        stats = {
-            'total_operations': len(self.operations),
-            'first_operation': self.operations[0].timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-            'last_operation': self.operations[-1].timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-            'categories_affected': set(),
-            'directories_created': set()
-        }
-        
+        fmt = '%Y-%m-%d %H:%M:%S'
+        categories_affected = set()
+        directories_created = set()
+        basename = os.path.basename
+        dirname = os.path.dirname
         for op in self.operations:
-            stats['categories_affected'].add(op.dest_path.parent.name)
-            if op.created_dir:
-                stats['directories_created'].add(str(op.created_dir))
+            categories_affected.add(basename(dirname(op.dest)))
+            if op.created:
+                directories_created.add(op.created)
         
-        return stats
\ No newline at end of file
+        return {
+            'total_operations': len(self.operations),
+            'first_operation': time.strftime(fmt, time.localtime(self.operations[0].timestamp)),
+            'last_operation': time.strftime(fmt, time.localtime(self.operations[-1].timestamp)),
+            'categories_affected': categories_affected,
+            'directories_created': directories_created
+        }
\ No newline at end of file
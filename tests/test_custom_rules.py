@@ -0,0 +1,85 @@
+import logging
+import os
+import tempfile
+import unittest
+
+from FileOrganizer import FileOrganizer
+
+
+def setUpModule():
+    # Keep the organizer's log file and console output out of the test run
+    logging.disable(logging.CRITICAL)
+
+
+def tearDownModule():
+    logging.disable(logging.NOTSET)
+
+
+class TestCustomRules(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.source_dir = self._tmp.name
+        self.organizer = FileOrganizer(self.source_dir)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_rules_are_combined_and_first_rule_wins(self):
+        self.assertTrue(self.organizer.add_custom_rule(r'\.jpg$', 'photos'))
+        self.assertTrue(self.organizer.add_custom_rule(r'\.(jpg|png)$', 'pictures'))
+        self.assertIsNotNone(self.organizer._rule_matcher)
+
+        self.assertEqual(self.organizer.get_category('.jpg'), 'photos')
+        self.assertEqual(self.organizer.get_category('.png'), 'pictures')
+        self.assertEqual(self.organizer.get_category('.JPG'), 'photos')
+        # Extensions no rule matches still use the standard categories
+        self.assertEqual(self.organizer.get_category('.gif'), 'images')
+        self.assertEqual(self.organizer.get_category('.xyz'), 'misc')
+
+    def test_rules_with_their_own_groups(self):
+        self.organizer.add_custom_rule(r'\.(?P<kind>tar)$', 'tarballs')
+        self.organizer.add_custom_rule(r'\.(t)(gz)$', 'tarballs')
+        self.assertIsNotNone(self.organizer._rule_matcher)
+
+        self.assertEqual(self.organizer.get_category('.tar'), 'tarballs')
+        self.assertEqual(self.organizer.get_category('.tgz'), 'tarballs')
+        self.assertEqual(self.organizer.get_category('.gz'), 'archives')
+
+    def test_backreference_falls_back_to_rule_by_rule(self):
+        self.organizer.add_custom_rule(r'\.jpg$', 'photos')
+        # \1 would point at the wrong group once the rules are fused
+        self.organizer.add_custom_rule(r'\.(\w)\1$', 'doubled')
+        self.assertIsNone(self.organizer._rule_matcher)
+
+        self.assertEqual(self.organizer.get_category('.jpg'), 'photos')
+        self.assertEqual(self.organizer.get_category('.aa'), 'doubled')
+        self.assertEqual(self.organizer.get_category('.ab'), 'misc')
+
+    def test_inline_flags_fall_back_to_rule_by_rule(self):
+        self.organizer.add_custom_rule(r'(?x) \.raw $', 'raw')
+        self.organizer.add_custom_rule(r'\.raw', 'never')
+        self.assertIsNone(self.organizer._rule_matcher)
+
+        self.assertEqual(self.organizer.get_category('.raw'), 'raw')
+
+    def test_invalid_pattern_is_rejected(self):
+        self.assertFalse(self.organizer.add_custom_rule(r'\.(jpg', 'photos'))
+        self.assertEqual(self.organizer.custom_rules, [])
+        self.assertEqual(self.organizer.get_category('.jpg'), 'images')
+
+    def test_adding_a_rule_clears_cached_categories(self):
+        self.assertEqual(self.organizer.get_category('.png'), 'images')
+        self.organizer.add_custom_rule(r'\.png$', 'screenshots')
+        self.assertEqual(self.organizer.get_category('.png'), 'screenshots')
+
+    def test_organize_moves_into_rule_destination(self):
+        with open(os.path.join(self.source_dir, 'plan.project'), 'w') as f:
+            f.write('plan')
+        self.organizer.add_custom_rule(r'\.project$', 'projects')
+
+        self.assertEqual(self.organizer.organize_files(), 1)
+        self.assertTrue(os.path.exists(os.path.join(self.source_dir, 'projects', 'plan.project')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+import errno
+import json
+import logging
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from FileOperation import FileOperation
+from FileOrganizer import FileOrganizer
+
+
+def setUpModule():
+    # Keep the organizer's log file and console output out of the test run
+    logging.disable(logging.CRITICAL)
+
+
+def tearDownModule():
+    logging.disable(logging.NOTSET)
+
+
+class HistoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.source_dir = self._tmp.name
+        self.history_file = os.path.join(self.source_dir, '.file_organizer_history.jsonl')
+        self.legacy_file = os.path.join(self.source_dir, '.file_organizer_history.json')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def make_files(self, *names):
+        for name in names:
+            with open(os.path.join(self.source_dir, name), 'w') as f:
+                f.write(name)
+
+    def read_lines(self):
+        with open(self.history_file, 'rb') as f:
+            return f.read().splitlines(keepends=True)
+
+
+class TestJsonLinesHistory(HistoryTestCase):
+    def test_organize_appends_one_line_per_move(self):
+        self.make_files('a.jpg', 'b.txt')
+        organizer = FileOrganizer(self.source_dir)
+        self.assertEqual(organizer.organize_files(), 2)
+        first = self.read_lines()
+        self.assertEqual(len(first), 2)
+
+        self.make_files('c.mp3')
+        organizer.organize_files()
+        lines = self.read_lines()
+        # Earlier lines are left as they were; only the new move is appended
+        self.assertEqual(lines[:2], first)
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[2])['dest_path'],
+                         os.path.join(self.source_dir, 'audio', 'c.mp3'))
+
+    def test_undo_truncates_the_last_line(self):
+        self.make_files('a.jpg', 'b.txt', 'c.mp3')
+        organizer = FileOrganizer(self.source_dir)
+        organizer.organize_files()
+        lines = self.read_lines()
+
+        self.assertTrue(organizer.undo_last())
+        self.assertEqual(self.read_lines(), lines[:2])
+
+        reloaded = FileOrganizer(self.source_dir)
+        self.assertEqual([op.dest for op in reloaded.operations],
+                         [op.dest for op in organizer.operations])
+
+    def test_undo_all_empties_the_file(self):
+        self.make_files('a.jpg', 'b.txt')
+        organizer = FileOrganizer(self.source_dir)
+        organizer.organize_files()
+
+        self.assertEqual(organizer.undo_all(), 2)
+        self.assertEqual(os.path.getsize(self.history_file), 0)
+        self.assertTrue(os.path.exists(os.path.join(self.source_dir, 'a.jpg')))
+
+    def test_partial_trailing_line_is_dropped(self):
+        self.make_files('a.jpg')
+        FileOrganizer(self.source_dir).organize_files()
+        complete = self.read_lines()
+        with open(self.history_file, 'ab') as f:
+            f.write(b'{"src_path": "/interrupted')
+
+        organizer = FileOrganizer(self.source_dir)
+        self.assertEqual(len(organizer.operations), 1)
+        self.assertEqual(self.read_lines(), complete)
+
+        # The next append starts on a fresh line
+        self.make_files('b.txt')
+        organizer.organize_files()
+        self.assertEqual(len(FileOrganizer(self.source_dir).operations), 2)
+
+    def test_failed_append_is_not_counted_as_saved(self):
+        self.make_files('a.jpg', 'b.txt')
+        organizer = FileOrganizer(self.source_dir)
+        organizer.organize_files()
+        size = os.path.getsize(self.history_file)
+
+        real_open = open
+
+        class FullDisk:
+            """Writes a few bytes of the batch, then fails like a full disk"""
+            def __init__(self, f):
+                self.f = f
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                self.f.close()
+
+            def __getattr__(self, name):
+                return getattr(self.f, name)
+
+            def write(self, data):
+                self.f.write(bytes(data[:5]))
+                raise OSError(errno.ENOSPC, 'No space left on device')
+
+        def failing_open(file, mode='r', **kwargs):
+            f = real_open(file, mode, **kwargs)
+            return FullDisk(f) if 'a' in mode else f
+
+        self.make_files('c.mp3', 'd.mp4')
+        with mock.patch('FileOrganizer.open', failing_open, create=True):
+            organizer.organize_files()
+        self.assertEqual(os.path.getsize(self.history_file), size)
+
+        # The unsaved operations go out with the next save, with no gap in the file
+        self.assertTrue(organizer.undo_last())
+        with open(self.history_file, 'rb') as f:
+            self.assertNotIn(b'\0', f.read())
+        self.assertEqual(len(FileOrganizer(self.source_dir).operations), 3)
+
+
+class TestLegacyHistoryMigration(HistoryTestCase):
+    def write_legacy_history(self, *names):
+        # The old format: one JSON array with ISO timestamps
+        history = []
+        os.makedirs(os.path.join(self.source_dir, 'images'))
+        for name in names:
+            dest = os.path.join(self.source_dir, 'images', name)
+            with open(dest, 'w') as f:
+                f.write(name)
+            history.append({
+                'src_path': os.path.join(self.source_dir, name),
+                'dest_path': dest,
+                'created_dir': None,
+                'timestamp': '2024-01-01T12:00:00'
+            })
+        with open(self.legacy_file, 'w') as f:
+            json.dump(history, f, indent=2)
+
+    def test_legacy_file_is_converted(self):
+        self.write_legacy_history('a.jpg', 'b.jpg')
+        organizer = FileOrganizer(self.source_dir)
+
+        self.assertEqual(len(organizer.operations), 2)
+        self.assertFalse(os.path.exists(self.legacy_file))
+        self.assertEqual(len(self.read_lines()), 2)
+
+        self.assertTrue(organizer.undo_last())
+        self.assertTrue(os.path.exists(os.path.join(self.source_dir, 'b.jpg')))
+        self.assertEqual(len(FileOrganizer(self.source_dir).operations), 1)
+
+    def test_legacy_file_is_kept_when_saving_fails(self):
+        self.write_legacy_history('a.jpg')
+        with mock.patch.object(FileOperation, 'to_dict', side_effect=ValueError('broken')):
+            organizer = FileOrganizer(self.source_dir)
+        self.assertEqual(len(organizer.operations), 1)
+        self.assertTrue(os.path.exists(self.legacy_file))
+        self.assertFalse(os.path.exists(self.history_file))
+
+        # The next load tries the migration again
+        self.assertEqual(len(FileOrganizer(self.source_dir).operations), 1)
+        self.assertFalse(os.path.exists(self.legacy_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
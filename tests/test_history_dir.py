@@ -0,0 +1,67 @@
+import logging
+import os
+import tempfile
+import unittest
+
+from FileOrganizer import FileOrganizer
+
+
+def setUpModule():
+    # Keep the organizer's log file and console output out of the test run
+    logging.disable(logging.CRITICAL)
+
+
+def tearDownModule():
+    logging.disable(logging.NOTSET)
+
+
+class TestHistoryDir(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.history_dir = os.path.join(self._tmp.name, 'history')
+        self.source_dir = self.make_source('downloads')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def make_source(self, *parts):
+        path = os.path.join(self._tmp.name, *parts)
+        os.makedirs(path)
+        with open(os.path.join(path, 'a.jpg'), 'w') as f:
+            f.write('a')
+        return path
+
+    def test_history_is_kept_outside_source_dir(self):
+        organizer = FileOrganizer(self.source_dir, history_dir=self.history_dir)
+        self.assertEqual(organizer.history_file.parent, organizer.source_dir.parent / 'history')
+        self.assertTrue(organizer.history_file.name.startswith('downloads_'))
+
+        organizer.organize_files()
+        self.assertTrue(organizer.history_file.exists())
+        self.assertEqual(sorted(os.listdir(self.source_dir)), ['images'])
+
+    def test_history_dir_is_created(self):
+        nested = os.path.join(self.history_dir, 'nested')
+        FileOrganizer(self.source_dir, history_dir=nested)
+        self.assertTrue(os.path.isdir(nested))
+
+    def test_reloaded_organizer_can_undo(self):
+        FileOrganizer(self.source_dir, history_dir=self.history_dir).organize_files()
+
+        organizer = FileOrganizer(self.source_dir, history_dir=self.history_dir)
+        self.assertEqual(len(organizer.operations), 1)
+        self.assertTrue(organizer.undo_last())
+        self.assertTrue(os.path.exists(os.path.join(self.source_dir, 'a.jpg')))
+
+    def test_directories_with_the_same_name_get_separate_files(self):
+        other = self.make_source('elsewhere', 'downloads')
+        first = FileOrganizer(self.source_dir, history_dir=self.history_dir)
+        second = FileOrganizer(other, history_dir=self.history_dir)
+        self.assertNotEqual(first.history_file, second.history_file)
+
+        first.organize_files()
+        self.assertEqual(len(FileOrganizer(other, history_dir=self.history_dir).operations), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()